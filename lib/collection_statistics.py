@@ -25,15 +25,81 @@ per content item. Example:
 __version__ = "2020.12.21"
 
 import datetime
+import io
+import itertools
 import json
 import logging
+import os
+import queue
+import threading
 from collections import Counter, defaultdict
-from typing import Optional, Set, Iterable
+from typing import Optional, Set, Iterable, Tuple
 
+import orjson
 from smart_open import open
 
+try:
+    import indexed_bzip2
+except ImportError:
+    indexed_bzip2 = None
+
 log = logging.getLogger(__name__)
 
+# size hint in bytes for the chunks of lines handed over by the reader thread and
+# maximal number of chunks that the reader thread may read ahead
+READ_CHUNK_SIZE = 1 << 20
+READ_QUEUE_SIZE = 8
+
+
+def open_infile(infile: str, decompression_threads: int = 1) -> io.BufferedIOBase:
+    """Return an input file opened in binary mode with a large read buffer.
+
+    Local bz2 files are decompressed with indexed_bzip2 if it is installed.
+
+    :param str infile: Path of the input file.
+    :param int decompression_threads: Number of threads for decompressing a local
+        bz2 file with indexed_bzip2.
+    :return: Binary reader of the (decompressed) input file.
+    :rtype: io.BufferedIOBase
+
+    """
+
+    if indexed_bzip2 is not None and infile.endswith(".bz2") and os.path.isfile(infile):
+        raw = indexed_bzip2.open(infile, parallelization=decompression_threads)
+    else:
+        raw = open(infile, mode="rb")
+
+    return io.BufferedReader(raw, buffer_size=4 << 20)
+
+
+def enqueue_lines(
+    infiles: Iterable[str], lines_queue: queue.Queue, decompression_threads: int = 1
+) -> None:
+    """Put chunks of raw lines of all input files in order into a queue.
+
+    This runs in a reader thread such that the decompression of the input files
+    overlaps with parsing and aggregating the content items. The end of the input is
+    signalled by None, a failure by the exception that was raised.
+
+    :param Iterable[str] infiles: Paths of the input files.
+    :param queue.Queue lines_queue: Bounded queue receiving lists of lines.
+    :param int decompression_threads: Number of threads for decompressing a local
+        bz2 file with indexed_bzip2.
+    :return: None.
+    :rtype: None
+
+    """
+
+    try:
+        for infile in infiles:
+            with open_infile(infile, decompression_threads) as reader:
+                while lines := reader.readlines(READ_CHUNK_SIZE):
+                    lines_queue.put(lines)
+    except Exception as e:
+        lines_queue.put(e)
+    else:
+        lines_queue.put(None)
+
 
 def update_relfreq(counter: Counter, n: Optional[int] = None, ndigits: int = 9) -> None:
     """Compute relative frequency of the language distribution.
@@ -52,6 +118,31 @@ def update_relfreq(counter: Counter, n: Optional[int] = None, ndigits: int = 9)
         counter[lang] = round(counter[lang] / n, ndigits)
 
 
+def top_language(decision: dict) -> Tuple[str, float, Optional[float]]:
+    """Return the top language of a decision, its score and the runner-up score.
+
+    Among languages with the same score, the first one wins as in Counter.most_common.
+    A tie between the two top languages shows as a runner-up score equal to the score.
+
+    :param dict decision: Non-empty distribution of scores per language.
+    :return: Top language, its score and the second highest score if any.
+    :rtype: Tuple[str, float, Optional[float]]
+
+    """
+
+    items = iter(decision.items())
+    lang, score = next(items)
+    runner_up_score = None
+    for other_lang, other_score in items:
+        if other_score > score:
+            runner_up_score = score
+            lang, score = other_lang, other_score
+        elif runner_up_score is None or other_score > runner_up_score:
+            runner_up_score = other_score
+
+    return lang, score, runner_up_score
+
+
 class AggregatorLID:
     """Assess confidence of multiple language identifiers based on global statistics.
 
@@ -71,6 +162,7 @@ class AggregatorLID:
     :param int minimal_text_length: Threshold on article length in chars for computing LID support by ensemble.
     :param str git_describe: Output of git describe to use as version if not empty string
     :param int round_ndigits: Number of decimal places in the output.
+    :param int decompression_threads: Number of threads for decompressing a local bz2 input file.
 
     :attr str version: Version of the collection script.
     :attr list attrs_for_json: Defines all attributes of this data object that
@@ -109,6 +201,7 @@ class AggregatorLID:
         round_ndigits: int,
         admissible_languages: Optional[Set[str]],
         git_describe: str,
+        decompression_threads: int = 1,
     ):
 
         self.attrs_for_json: list = [
@@ -137,6 +230,8 @@ class AggregatorLID:
 
         self.infile: str = infile
 
+        self.decompression_threads: int = max(1, decompression_threads or 1)
+
         self.collection: str = collection
 
         self.lids: Set[str] = set(lid for lid in lids if lid != "orig_lg")
@@ -161,6 +256,13 @@ class AggregatorLID:
 
         self.boost_factor: float = boost_factor
 
+        # vote weight per LID (including orig_lg) and LIDs in a fixed iteration order
+        self._lid_boost: dict = {
+            lid: (self.boost_factor if lid in self.boosted_lids else 1)
+            for lid in self.lids.union(("orig_lg",))
+        }
+        self._lids: tuple = tuple(self.lids)
+
         self.minimal_vote_score: float = minimal_vote_score
 
         self.minimal_lid_probability: float = minimal_lid_probability
@@ -179,17 +281,19 @@ class AggregatorLID:
 
         self.dominant_language: Optional[str] = None
 
+        # the frequency distributions are counted in defaultdicts, which update faster
+        # than Counters, and turned into Counters by collect_statistics
         self.lg_support: dict = {
-            lid: Counter() for lid in self.lids.union(("orig_lg",))
+            lid: defaultdict(int) for lid in self.lids.union(("orig_lg",))
         }
 
         self.lid_distributions: dict = {
-            lid: Counter() for lid in self.lids.union(("orig_lg", "ensemble"))
+            lid: defaultdict(int) for lid in self.lids.union(("orig_lg", "ensemble"))
         }
 
-        self.contentitem_type_distribution: Counter = Counter()
+        self.contentitem_type_distribution: dict = defaultdict(int)
 
-        self.content_length_stats: Counter = Counter()
+        self.content_length_stats: dict = defaultdict(int)
 
     def run(self):
         """Run the application"""
@@ -207,39 +311,51 @@ class AggregatorLID:
 
         """
 
-        for infile in self.infile:
-            with open(infile) as infile:
-                for line in infile:
-                    contentitem = json.loads(line)
-                    yield contentitem
+        lines_queue = queue.Queue(maxsize=READ_QUEUE_SIZE)
+        threading.Thread(
+            target=enqueue_lines,
+            args=(self.infile, lines_queue, self.decompression_threads),
+            daemon=True,
+        ).start()
 
-    def update_lid_distributions(self, content_item: dict) -> None:
-        """Update the self.lid_distribution statistics.
+        while (lines := lines_queue.get()) is not None:
+            if isinstance(lines, Exception):
+                raise lines
+            for line in lines:
+                if line.strip():
+                    yield orjson.loads(line)
 
-        The statistics covers all LID systems as well as orig_lg.
-        The ensemble predictions are not computed here.
+    def update_lid_statistics(self, content_item: dict, lang: Optional[str]) -> None:
+        """Update the self.lid_distributions and self.lg_support statistics.
 
+        The statistics cover all LID systems as well as orig_lg.
+        The ensemble predictions are not computed here.
 
         :param dict content_item: A single content item.
+        :param Optional[str] lang: Language decided by the ensemble if any.
         :return: None.
         :rtype: None
 
         """
 
-        # update stats for all regular LID systems
-        for lid in self.lids:
-            if (
-                lid in content_item
-                and content_item[lid] is not None
-                and len(content_item[lid]) > 0
-            ):
-                lang = content_item[lid][0]["lang"]
-                self.lid_distributions[lid][lang] += 1
+        lid_distributions = self.lid_distributions
+        lg_support = self.lg_support
+
+        # update stats for all regular LID systems and their support by the ensemble
+        for lid in self._lids:
+            lid_preds = content_item.get(lid)
+            if lid_preds:
+                lid_lang = lid_preds[0]["lang"]
+                lid_distributions[lid][lid_lang] += 1
+                if lid_lang == lang:
+                    lg_support[lid][lang] += 1
 
-        # update stats for orig_lg
+        # update stats for orig_lg and its support by the ensemble
         orig_lg = content_item.get("orig_lg")
         if orig_lg:
-            self.lid_distributions["orig_lg"][orig_lg] += 1
+            lid_distributions["orig_lg"][orig_lg] += 1
+            if orig_lg == lang:
+                lg_support["orig_lg"][lang] += 1
 
     def get_votes(self, content_item: dict) -> Optional[Counter]:
         """Return ensemble votes per language after boosting.
@@ -250,58 +366,44 @@ class AggregatorLID:
 
         """
 
-        # for each language key we have a list of tuples (LID, vote_score)
-        votes = defaultdict(list)
+        lid_boost = self._lid_boost
+        admissible_languages = self.admissible_languages
+        minimal_lid_probability = self.minimal_lid_probability
 
-        if content_item.get("orig_lg"):
-            votes[content_item.get("orig_lg")].append(
-                (
-                    "orig_lg",
-                    (1 if "orig_lg" not in self.boosted_lids else self.boost_factor),
-                )
-            )
-        for lid in self.lids:
-            if (
-                lid in content_item
-                and content_item[lid] is not None
-                and len(content_item[lid]) > 0
-            ):
-                lang, prob = (
-                    content_item.get(lid)[0]["lang"],
-                    content_item.get(lid)[0]["prob"],
-                )
-                if (
-                    self.admissible_languages is None
-                    or lang in self.admissible_languages
-                ):
-                    if prob >= self.minimal_lid_probability:
-                        votes[lang].append(
-                            (
-                                lid,
-                                (
-                                    1
-                                    if lid not in self.boosted_lids
-                                    else self.boost_factor
-                                ),
-                            )
-                        )
+        # for each language key we have the number of votes and their boosted sum
+        votes = {}
+
+        orig_lg = content_item.get("orig_lg")
+        if orig_lg:
+            votes[orig_lg] = [1, lid_boost["orig_lg"]]
+        for lid in self._lids:
+            lid_preds = content_item.get(lid)
+            if lid_preds:
+                lang, prob = lid_preds[0]["lang"], lid_preds[0]["prob"]
+                if admissible_languages is None or lang in admissible_languages:
+                    if prob >= minimal_lid_probability:
+                        tally = votes.get(lang)
+                        if tally is None:
+                            votes[lang] = [1, lid_boost[lid]]
+                        else:
+                            tally[0] += 1
+                            tally[1] += lid_boost[lid]
 
         # for each language key we have a voting score across systems
         # consider boost for a particular language only when at least another system supports prediction
         decision = Counter()
-        for lang, votes_lang in votes.items():
-            decision[lang] = sum(
-                (boost if len(votes_lang) > 1 else 1) for (_, boost) in votes_lang
-            )
+        for lang, (n_votes, boosted_score) in votes.items():
+            score = boosted_score if n_votes > 1 else 1
             # ignore predictions a score below the threshold after boosting
-            if decision[lang] < self.minimal_vote_score:
-                del decision[lang]
-
-        log.debug(
-            f"Decisions: {decision if len(decision) > 0 else None} "
-            f"votes = {dict(votes)} decision-distro {decision} decision = "
-            f"content_item ={content_item}"
-        )
+            if score >= self.minimal_vote_score:
+                decision[lang] = score
+
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(
+                f"Decisions: {decision if len(decision) > 0 else None} "
+                f"votes = {votes} decision-distro {decision} decision = "
+                f"content_item ={content_item}"
+            )
 
         if len(decision) < 1:  # no decision taken
             return None
@@ -319,16 +421,19 @@ class AggregatorLID:
         - self.lg_support
         """
 
-        for ci in self.get_next_contentitem():
+        contentitems = self.get_next_contentitem()
 
-            # we can infer the collection name from impresso content item naming schema
-            if self.collection is None:
-                # the suffix is fixed whereas the former part of the id may vary
-                # example of an content item ID: luxzeit1858-1859-01-01-a-i0001
-                self.collection = ci["id"][0 : len(ci["id"]) - 19]
-                log.warning(
-                    f"Inferred collection name from first content item as '{self.collection}'"
-                )
+        # we can infer the collection name from impresso content item naming schema
+        if self.collection is None and (ci := next(contentitems, None)) is not None:
+            # the suffix is fixed whereas the former part of the id may vary
+            # example of an content item ID: luxzeit1858-1859-01-01-a-i0001
+            self.collection = ci["id"][0 : len(ci["id"]) - 19]
+            log.warning(
+                f"Inferred collection name from first content item as '{self.collection}'"
+            )
+            contentitems = itertools.chain((ci,), contentitems)
+
+        for ci in contentitems:
 
             # update content type statistics
             self.contentitem_type_distribution[ci.get("tp")] += 1
@@ -338,31 +443,33 @@ class AggregatorLID:
                 continue
 
             # update statistics on content item length and ignore very short items
+            # the alphabetical ratio is at most 1, so the raw length is checked first
             ci_len = ci.get("len", 0)
             self.content_length_stats[ci_len] += 1
             if (
-                (a_ratio := ci.get("alphabetical_ratio", 0)) < 0.5
-            ) or ci_len * a_ratio < self.minimal_text_length:
-                log.debug(
-                    f"Ignore short content item: {ci['id']}\t(length: {ci.get('len', 0)})"
-                )
+                ci_len < self.minimal_text_length
+                or (a_ratio := ci.get("alphabetical_ratio", 0)) < 0.5
+                or ci_len * a_ratio < self.minimal_text_length
+            ):
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug(
+                        f"Ignore short content item: {ci['id']}\t(length: {ci_len})"
+                    )
                 continue
 
             # update counter for content item with textual content
             self.n += 1
 
-            # update lid systems counts (including orig_lg)
-            self.update_lid_distributions(ci)
-
             # compute the ensemble voting decision (if any)
             decision = self.get_votes(ci)
 
             if decision is None:
                 lang = None
             else:
-                lang, score = decision.most_common(1)[0]
-                log.debug(f"Decision taken: lang={lang} score={score}")
-                if len(decision) > 1 and decision.most_common(2)[1][1] == score:
+                lang, score, runner_up_score = top_language(decision)
+                if log.isEnabledFor(logging.DEBUG):
+                    log.debug(f"Decision taken: lang={lang} score={score}")
+                if runner_up_score == score:
                     log.warning(
                         f"Ignore decision for {ci['id']} as there is a tie between the two top predicted languages {decision}"
                     )
@@ -372,19 +479,15 @@ class AggregatorLID:
             if lang is not None:
                 self.lid_distributions["ensemble"][lang] += 1
 
-            # update the statistics on the support of the ensemble prediction for individual LID predictions
-            for lid in self.lids:
-                lid_lg_info = ci.get(lid)
-                if lid_lg_info and len(lid_lg_info) > 0:
-                    lid_lg = lid_lg_info[0]["lang"]
-                    if lid_lg == lang:
-                        self.lg_support[lid][lang] += 1
+            # update lid systems counts (including orig_lg) and their support by the ensemble
+            self.update_lid_statistics(ci, lang)
 
-            # update the orig_lg support statistics
-            orig_lg = ci.get("orig_lg")
-            if orig_lg:
-                if lang == orig_lg:
-                    self.lg_support["orig_lg"][lang] += 1
+        # turn the counted frequency distributions into Counters
+        for stats in (self.lg_support, self.lid_distributions):
+            for lid in stats:
+                stats[lid] = Counter(stats[lid])
+        self.contentitem_type_distribution = Counter(self.contentitem_type_distribution)
+        self.content_length_stats = Counter(self.content_length_stats)
 
     def compute_support(self) -> None:
         """Update the support statistics with relative frequencies
@@ -530,6 +633,13 @@ if __name__ == "__main__":
         default="",
         help="output of git describe command for ingesting git version into JSON as version string",
     )
+    parser.add_argument(
+        "--decompression-threads",
+        default=1,
+        type=int,
+        metavar="N",
+        help="number of threads for decompressing local bz2 input files with indexed_bzip2; raise only if the CPUs are not used by other processes (default %(default)s)",
+    )
 
     parser.add_argument(
         "infile",
@@ -565,6 +675,7 @@ if __name__ == "__main__":
         "round_ndigits",
         "git_describe",
         "admissible_languages",
+        "decompression_threads",
     }
 
     AggregatorLID(
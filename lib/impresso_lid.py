@@ -19,8 +19,8 @@ import sys
 from collections import Counter, defaultdict
 from typing import DefaultDict, Iterable, List, Optional, Set
 
-import jsonlines
 import jsonschema
+import orjson
 import smart_open
 
 log = logging.getLogger(__name__)
@@ -71,7 +71,6 @@ class ImpressoLanguageIdentifier(object):
         from stage 2
     :attr DefaultDict[Counter] stats: Distribution for any JSON property of interest
         (given as key)
-    :attr list results: Collection of content items with their identified language.
     :attr dict schema: JSON schema for the output JSON
     :attr method schema_validator: JSON schema validator
     """
@@ -155,7 +154,6 @@ class ImpressoLanguageIdentifier(object):
         self.stats: DefaultDict[str, Counter] = defaultdict(Counter)
         self.stats_keys: List[str] = ["lg", "orig_lg", "tp", "lg_decision"]
         self.collection_stats: dict = read_json(collection_stats_filename)
-        self.results: List[dict] = []
 
         self.validate: bool = validate
         if self.validate:
@@ -164,9 +162,7 @@ class ImpressoLanguageIdentifier(object):
     def run(self):
         """Run the application"""
 
-        self.update_impresso_lid_results()
-        self.write_output()
-        self.update_stats()
+        self.write_output(self.impresso_lid_results())
         self.write_diagnostics()
 
     def load_schema(self) -> None:
@@ -202,12 +198,13 @@ class ImpressoLanguageIdentifier(object):
             resolver=resolver,
         )
 
-    def write_output(self) -> None:
-        """Write JSONlines output"""
+    def write_output(self, results: Iterable[dict]) -> None:
+        """Write JSONlines output as soon as the results are available"""
 
-        with smart_open.open(self.outfile, mode="w", encoding="utf-8") as of:
-            writer = jsonlines.Writer(of)
-            writer.write_all(self.results)
+        with smart_open.open(self.outfile, mode="wb") as of:
+            for r in results:
+                of.write(orjson.dumps(r))
+                of.write(b"\n")
 
     def write_diagnostics(self) -> None:
         """Write JSON diagnostics with per-collectio stats"""
@@ -218,10 +215,10 @@ class ImpressoLanguageIdentifier(object):
     def next_content_item(self) -> Iterable[dict]:
         """Yield next content item"""
 
-        with smart_open.open(self.infile, mode="r", encoding="utf-8") as reader:
-            json_reader = jsonlines.Reader(reader)
-            for jdata in json_reader:
-                yield jdata
+        with smart_open.open(self.infile, mode="rb") as reader:
+            for line in reader:
+                if line.strip():
+                    yield orjson.loads(line)
 
     def cleanup_attrs(self, jinfo: dict) -> dict:
         """Return copy of jinfo with ordered required attributes
@@ -294,12 +291,17 @@ class ImpressoLanguageIdentifier(object):
 
         return decision
 
-    def update_impresso_lid_results(self) -> None:
-        """Update self.results with all language classification decisions"""
+    def impresso_lid_results(self) -> Iterable[dict]:
+        """Yield the language classification decision per content item
+
+        The per-collection statistics are updated with each decision.
+        """
 
         for c in self.next_content_item():
             log.info(f"Processing {c['id']}")
-            self.results.append(self.decide_lg(c))
+            result = self.decide_lg(c)
+            self.update_stats(result)
+            yield result
 
     def decide_lg(self, content_item: dict) -> dict:
         """Return a dict with decision information for a content item"""
@@ -367,7 +369,9 @@ class ImpressoLanguageIdentifier(object):
         )
 
         # rule 2b: off-the-shelf LID agree on language other than DE or FR
-        if len(all_but_impresso_ft_lid_languages) == 1:
+        # LIDs skipped in stage 1a because of a confident impresso_ft cannot agree
+        skipped_lids = self.lids.intersection(content_item.get("skipped_lids") or ())
+        if len(all_but_impresso_ft_lid_languages) == 1 and not skipped_lids:
             other_lg = min(
                 all_but_impresso_ft_lid_languages
             )  # min is just used to select the only element
@@ -402,13 +406,12 @@ class ImpressoLanguageIdentifier(object):
         decided_content_item["lg_decision"] = "voting"
         return self.cleanup_attrs(decided_content_item)
 
-    def update_stats(self) -> None:
-        """Update per-collection statistics for diagnostics"""
+    def update_stats(self, r: dict) -> None:
+        """Update per-collection statistics for diagnostics with a decision"""
 
-        for r in self.results:
-            for p in self.stats_keys:
-                self.stats[p][r.get(p)] += 1
-            self.stats["N"][f'{self.collection_stats["collection"]}-{r["year"]}'] += 1
+        for p in self.stats_keys:
+            self.stats[p][r.get(p)] += 1
+        self.stats["N"][f'{self.collection_stats["collection"]}-{r["year"]}'] += 1
 
 
 if __name__ == "__main__":
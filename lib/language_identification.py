@@ -7,27 +7,132 @@ systems
 
 __version__ = "2024.04.12"
 
+import concurrent.futures
 import datetime
+import hashlib
+import io
+import itertools
 import json
 import logging
+import multiprocessing
+from multiprocessing.util import Finalize
+import os
 import re
 import sys
-from collections import Counter
-from typing import Dict, List, Optional, Iterable, Set, Union, Tuple
+import time
+from collections import Counter, OrderedDict, defaultdict, deque
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Iterable,
+    Set,
+    Union,
+    Tuple,
+)
 
 import fasttext
-import langdetect
+import numpy as np
+import orjson
+from langdetect import detector_factory
+from langdetect.detector import Detector
 from langdetect.lang_detect_exception import LangDetectException
+from langdetect.utils.lang_profile import LangProfile
 from langid import langid
 import smart_open
 
+try:
+    import indexed_bzip2
+except ImportError:
+    indexed_bzip2 = None
+
 log = logging.getLogger(__name__)
 
+# lookup table of the characters counted for the alphabetical ratio, i.e. all characters
+# not matched by [\W_\d]: alphanumeric characters except decimal digits
+_ALPHABETIC_LUT = np.fromiter(
+    (c.isalnum() and not c.isdecimal() for c in map(chr, range(sys.maxunicode + 1))),
+    dtype=np.bool_,
+    count=sys.maxunicode + 1,
+)
+
+# ASCII characters not counted for the alphabetical ratio, i.e. all but ASCII letters
+_NONALPHABETIC_ASCII = bytes(i for i in range(128) if not _ALPHABETIC_LUT[i])
+
+# digits are ignored by the fasttext models; for non-ASCII texts, the regex is several
+# times faster than str.translate with a deletion table
+_DIGIT_RE = re.compile(r"\d+")
+
+# maximal number of cached LID results per process; language codes in the results are
+# interned, so all cached results share a single string object per language
+LID_CACHE_SIZE: int = 100_000
+
+# number of content items processed together, e.g. for batched fasttext predictions
+LID_BATCH_SIZE: int = 128
+
+# langdetect profiles to load; langdetect has no profile for Luxembourgish
+LANGDETECT_LANGUAGES: Set[str] = {"de", "fr", "en", "it", "es", "nl", "pt"}
+
+
+def _patched_init_factory() -> None:
+    """Initialize the global langdetect factory with a subset of language profiles.
+
+    Replicates `langdetect.detector_factory.init_factory`, but only loads the profiles
+    listed in LANGDETECT_LANGUAGES. Every loaded profile is scored for each sample,
+    therefore restricting the profiles reduces memory and computation time.
+
+    """
+
+    if detector_factory._factory is not None:
+        return
+
+    factory = detector_factory.DetectorFactory()
+    langs = sorted(LANGDETECT_LANGUAGES)
+    for index, lang in enumerate(langs):
+        profile_file = os.path.join(detector_factory.PROFILES_DIRECTORY, lang)
+        with open(profile_file, encoding="utf-8") as f:
+            factory.add_profile(LangProfile(**json.load(f)), index, len(langs))
+    detector_factory._factory = factory
+
+
+detector_factory.init_factory = _patched_init_factory
+
+
+class SampleDetector(Detector):
+    """Langdetect detector that can draw several samples for the same text.
+
+    Cleaning the text and extracting its n-grams is done only once. For each sample,
+    set a new seed and reset langprob before calling get_probabilities(). The results
+    are identical to a new detector per sample.
+
+    """
+
+    _ngrams: Optional[list] = None
+
+    def cleaning_text(self) -> None:
+        if self._ngrams is None:
+            super().cleaning_text()
+
+    def _extract_ngrams(self) -> list:
+        if self._ngrams is None:
+            self._ngrams = super()._extract_ngrams()
+        return self._ngrams
+
+
+class LidPrediction(NamedTuple):
+    """Language/probability pair with the same attributes as langdetect results."""
+
+    lang: str
+    prob: float
+
 
 def alphabetical_ratio(text: str) -> Optional[float]:
     """Return the percentage of alphabetic characters of a text
 
-    All digits, punctuation symbols, layout characters, are removed
+    All digits, punctuation symbols, layout characters, are not counted
 
     :param str text: Any text.
     :return: Ratio of alphabetic characters wrt to total length of text.
@@ -38,9 +143,18 @@ def alphabetical_ratio(text: str) -> Optional[float]:
     len_text = len(text)
     if len_text == 0:
         return None
-    filtered = re.sub(r"[\W_\d]+", "", text)
 
-    return len(filtered) / len_text
+    # pure ASCII texts are counted by deleting the non-alphabetic bytes
+    if text.isascii():
+        return (
+            len(text.encode("ascii").translate(None, _NONALPHABETIC_ASCII)) / len_text
+        )
+
+    codepoints = np.frombuffer(
+        text.encode("utf-32-le", errors="surrogatepass"), dtype=np.uint32
+    )
+
+    return int(np.count_nonzero(_ALPHABETIC_LUT.take(codepoints))) / len_text
 
 
 def average_distribution(
@@ -56,23 +170,22 @@ def average_distribution(
     """
 
     total = len(listoflist)
-    counter = Counter()
+    # a plain dict is cheaper than a defaultdict for a handful of languages
+    totals = {}
     for row in listoflist:
         for r in row:
-            counter[r.lang] += r.prob
-    for lang in counter:
-        counter[lang] = counter[lang] / total
+            totals[r.lang] = totals.get(r.lang, 0.0) + r.prob
 
     result = [
-        {"lang": lang, "prob": round(prob, round_ndigits)}
-        for lang, prob in counter.most_common()
+        {"lang": lang, "prob": round(prob / total, round_ndigits)}
+        for lang, prob in sorted(totals.items(), key=lambda kv: -kv[1])
     ]
 
-    log.debug(
-        "DEBUG-LANGDETECT-DIVERSITY Length: %s Predictions: %s",
-        len(listoflist),
-        listoflist,
-    )
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(
+            f"DEBUG-LANGDETECT-DIVERSITY Length: {len(listoflist)} "
+            f"Predictions: {listoflist}"
+        )
 
     return result
 
@@ -101,48 +214,694 @@ def avg_langdetect_lid(
     :rtype: List[Dict[str, float]]
 
     """
-    langdetect.DetectorFactory.seed = seed
+    detector_factory.init_factory()
+    detector = SampleDetector(detector_factory._factory)
+    detector.append(text)
 
     results = []
     for i in range(n):
-        langdetect.DetectorFactory.seed += i
-        result = langdetect.detect_langs(text)
+        seed += i
+        detector.seed = seed
+        detector.langprob = None
+        result = detector.get_probabilities()
         results.append(result)
         if result[0].prob > threshold and result[0].lang in default_languages:
             break
 
+    # a single decisive sample needs no averaging
+    if len(results) == 1:
+        return [
+            {"lang": r.lang, "prob": round(r.prob, round_ndigits)} for r in results[0]
+        ]
+
     return average_distribution(results, round_ndigits)
 
 
 def fasttext_lid(
-    text: str, ft_model, round_ndigits: int = 9
+    text: str, ft_model, round_ndigits: int = 9, strip_digits: bool = True
 ) -> List[Dict[str, Union[str, float]]]:
     """
     Return results of a fasttext model.
 
-    The only normalization is mapping digits to 0. The internal function predict of
-    fasttext returns a pair of tuples
+    The only normalization is removing digits, which can be skipped with strip_digits
+    if the text has been normalized already. The internal function predict of
+    fasttext returns a pair of lists for a list of texts
 
-    In [16]: m.predict(''' l'eût cru, le rêve de M. Mitterand, c'est d'e''',k=3)
-    Out[16]: (('__label__fr', '__label__lb', '__label__de'),
-             array([9.99996185e-01, 2.38023513e-05, 1.00000034e-05]))
+    In [16]: m.predict([''' l'eût cru, le rêve de M. Mitterand, c'est d'e'''],k=3)
+    Out[16]: ([['__label__fr', '__label__lb', '__label__de']],
+             [array([9.99996185e-01, 2.38023513e-05, 1.00000034e-05])])
     """
 
     # ignore digits
-    text = re.sub(r"\d+", "", text)
+    if strip_digits:
+        text = _DIGIT_RE.sub("", text)
+
+    # predicting a single string fails under numpy 2 with fasttext 0.9.3
+    all_labels, all_probs = ft_model.predict([text], k=3, threshold=0.05)
+    labels, probs = all_labels[0], all_probs[0].astype(np.float64)
+    probs = np.minimum(np.round(probs, round_ndigits), 1).tolist()
+
+    # strip the prefix __label__ from the labels
+    return [
+        {"lang": sys.intern(lang[9:]), "prob": prob}
+        for lang, prob in zip(labels, probs)
+    ]
 
-    labels, probs = ft_model.predict(text, k=3, threshold=0.05)
-    result = [
+
+def fasttext_lids(
+    texts: List[str], ft_model, round_ndigits: int = 9
+) -> List[List[Dict[str, Union[str, float]]]]:
+    """Return results of a fasttext model for multiple texts predicted in a single call.
+
+    The results are identical to calling fasttext_lid for each text, but the overhead
+    of the calls into fasttext is paid only once. Texts are expected without digits.
+    As for fasttext_lid, texts with newlines raise a ValueError.
+
+    :param List[str] texts: Texts to classify.
+    :param ft_model: Fasttext LID model.
+    :param int round_ndigits: Number of decimal places for probabilities.
+    :return: Language/probability pairs per text.
+    :rtype: List[List[Dict[str, float]]]
+
+    """
+
+    if not texts:
+        return []
+
+    all_labels, all_probs = ft_model.predict(texts, k=3, threshold=0.05)
+
+    # round the probabilities of all texts at once
+    probs = np.concatenate(all_probs).astype(np.float64)
+    probs = iter(np.minimum(np.round(probs, round_ndigits), 1).tolist())
+
+    return [
+        [
+            {"lang": sys.intern(lang[9:]), "prob": prob}
+            for lang, prob in zip(labels, probs)
+        ]
+        for labels in all_labels
+    ]
+
+
+def avg_fasttext_lid(
+    text: str,
+    ft_model,
+    n: int = 3,
+    round_ndigits: int = 9,
+    strip_digits: bool = True,
+) -> List[Dict[str, Union[str, float]]]:
+    """Compute averaged lid score of a fasttext model over n slices of a text.
+
+    The slices are predicted in a single call of the fasttext model. This provides
+    an averaged distribution similar to avg_langdetect_lid at a fraction of its cost.
+
+    :param str text: Text to classify.
+    :param ft_model: Fasttext LID model.
+    :param int n: Number of slices.
+    :param int round_ndigits: Number of decimal places for probabilities.
+    :param bool strip_digits: Remove digits from the text before prediction.
+    :return: Dictionary with the averaged probabilities per language
+    :rtype: List[Dict[str, float]]
+
+    """
+
+    # ignore digits
+    if strip_digits:
+        text = _DIGIT_RE.sub("", text)
+
+    size = max(1, -(-len(text) // n))
+    slices = [text[i : i + size] for i in range(0, len(text), size)] or [text]
+
+    all_labels, all_probs = ft_model.predict(slices, k=3, threshold=0.05)
+    results = [
+        [
+            LidPrediction(sys.intern(lang[9:]), float(prob))
+            for lang, prob in zip(labels, probs)
+        ]
+        for labels, probs in zip(all_labels, all_probs)
+    ]
+
+    return average_distribution(results, round_ndigits)
+
+
+class SparseLangid(langid.LanguageIdentifier):
+    """Langid classifier that skips the dense feature vector for short texts.
+
+    The original implementation counts all features of a text in a vector of the size
+    of the feature space and multiplies it with the full model matrix. For short texts,
+    summing the rows of the traversed features directly is much faster.
+
+    With norm_probs, only the probability of the top-most language is normalized
+    instead of the full distribution over all languages.
+
+    """
+
+    def __init__(
+        self,
+        nb_ptc,
+        nb_pc,
+        nb_numfeats,
+        nb_classes,
+        tk_nextmove,
+        tk_output,
+        norm_probs: bool = langid.NORM_PROBS,
+    ):
+        super().__init__(
+            nb_ptc, nb_pc, nb_numfeats, nb_classes, tk_nextmove, tk_output, False
+        )
+        self.normalize: bool = norm_probs
+
+    def instance2classprobs(self, text: str) -> np.ndarray:
+        """Return the log-probabilities of all languages for a text.
+
+        :param str text: Text to classify.
+        :return: Unnormalized log-probability of the text per language.
+        :rtype: np.ndarray
+
+        """
+
+        text = text.encode("utf8")
+        tk_nextmove = self.tk_nextmove
+        tk_output = self.tk_output
+
+        state = 0
+        if len(text) < self.nb_numfeats / 10:
+            indices = []
+            for letter in text:
+                state = tk_nextmove[(state << 8) + letter]
+                indices.extend(tk_output.get(state, ()))
+            pdc = self.nb_ptc[indices].sum(0, dtype=np.float64)
+        else:
+            statecount = defaultdict(int)
+            for letter in text:
+                state = tk_nextmove[(state << 8) + letter]
+                statecount[state] += 1
+            arr = np.zeros((self.nb_numfeats,), dtype="uint32")
+            for state, count in statecount.items():
+                for index in tk_output.get(state, ()):
+                    arr[index] += count
+            pdc = np.dot(arr, self.nb_ptc)
+
+        return pdc + self.nb_pc
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """Return the most probable language of a text and its probability.
+
+        :param str text: Text to classify.
+        :return: Language and probability.
+        :rtype: Tuple[str, float]
+
+        """
+
+        pd = self.instance2classprobs(text)
+        cl = np.argmax(pd)
+        if not self.normalize:
+            return sys.intern(str(self.nb_classes[cl])), float(pd[cl])
+
+        # same as langid's log-sum-exp normalization, restricted to the top-most
+        # language
+        with np.errstate(over="ignore"):
+            prob = 1 / np.exp(pd - pd[cl]).sum()
+        return sys.intern(str(self.nb_classes[cl])), float(prob)
+
+
+def langid_lid(
+    text: str, langid_model: langid.LanguageIdentifier, round_ndigits: int = 9
+) -> List[Dict[str, Union[str, float]]]:
+    """Return the top-most language of a text predicted by langid.
+
+    :param str text: Text to classify.
+    :param langid.LanguageIdentifier langid_model: Langid classifier.
+    :param int round_ndigits: Number of decimal places for probabilities.
+    :return: List with a single language/probability pair.
+    :rtype: List[Dict[str, float]]
+
+    """
+
+    lang, prob = langid_model.classify(text)
+    return [{"lang": lang, "prob": round(prob, round_ndigits)}]
+
+
+def load_fasttext_model(path: str, quantize: bool = False):
+    """Load a fasttext model and optionally quantize it in memory.
+
+    Quantization compresses the embedding matrix of a model, which reduces its memory
+    footprint and bandwidth during prediction at the cost of a slightly different
+    output. Without the training data, the dictionary is not pruned. For repeated
+    runs, quantized .ftz models created by lib/quantize_fasttext.py are loaded faster.
+
+    :param str path: Path to binary (.bin) or quantized (.ftz) fasttext model.
+    :param bool quantize: Quantize the model if it is not quantized already.
+    :return: Fasttext model.
+    :rtype: fasttext.FastText._FastText
+
+    """
+
+    model = fasttext.load_model(path)
+    if quantize and not model.is_quantized():
+        log.info(f"Quantizing fasttext model {path}")
+        model.quantize(qnorm=True)
+    return model
+
+
+# LID models and settings of the current process, set by _init_worker() and inherited
+# by forked worker processes
+_worker: dict = {}
+
+
+def _init_worker(
+    impresso_ft: Optional[str],
+    wp_ft: Optional[str],
+    lids: Set[str],
+    minimal_text_length: int,
+    alphabetical_ratio_threshold: float,
+    round_ndigits: int,
+    version: str,
+    quantize_models: bool = False,
+    confidence_skip_threshold: Optional[float] = None,
+    lid_max_chars: Optional[int] = None,
+) -> None:
+    """Load the LID models and settings into the current process.
+
+    Worker processes forked afterwards share the loaded models copy-on-write instead of
+    loading them again.
+
+    :param Optional[str] impresso_ft: Path to binary fasttext LID impresso model.
+    :param Optional[str] wp_ft: Path to binary fasttext LID Wikipedia model.
+    :param Set[str] lids: Set of LID systems to apply.
+    :param int minimal_text_length: Threshold for text length in characters to apply
+        automatic language identification.
+    :param float alphabetical_ratio_threshold: Threshold for the alphabetical ratio
+        of a text to apply automatic language identification.
+    :param int round_ndigits: Number of decimal places in the output.
+    :param str version: Version string recorded for each content item.
+    :param bool quantize_models: Quantize the fasttext models after loading.
+    :param Optional[float] confidence_skip_threshold: Skip langdetect and langid if
+        the top-most probability of impresso_ft reaches this threshold.
+    :param Optional[int] lid_max_chars: Only use the first characters of a text for
+        language identification.
+    :return: None.
+    :rtype: None
+
+    """
+
+    # load the langdetect profiles now instead of on first use in each worker process
+    detector_factory.init_factory()
+
+    # initialize with langid lid classifier
+    langid_model = SparseLangid.from_modelstring(langid.model, norm_probs=True)
+    # we no longer restrict it to certain languages
+    # langid_model.set_languages(['de', 'fr', 'en', 'lb'])
+
+    # load provided FastText models
+    impresso_ft_model = wp_ft_model = None
+
+    if impresso_ft is not None:
+        impresso_ft_model = load_fasttext_model(impresso_ft, quantize_models)
+    if wp_ft is not None:
+        wp_ft_model = load_fasttext_model(wp_ft, quantize_models)
+
+    _worker.update(
         {
-            "lang": lang.replace("__label__", ""),
-            "prob": float(min(1, round(probs[i], round_ndigits))),
+            "lid_cache": OrderedDict(),
+            "lid_cache_lookups": Counter(),
+            "lid_cache_predictions": Counter(),
+            "langid_model": langid_model,
+            "impresso_ft_model": impresso_ft_model,
+            "wp_ft_model": wp_ft_model,
+            "lids": lids,
+            "minimal_text_length": minimal_text_length,
+            "alphabetical_ratio_threshold": alphabetical_ratio_threshold,
+            "confidence_skip_threshold": confidence_skip_threshold,
+            "lid_max_chars": lid_max_chars,
+            "round_ndigits": round_ndigits,
+            "version": version,
         }
-        for (i, lang) in enumerate(labels)
-    ]
+    )
+
 
+def _cached_lid(lid: str, digest: bytes, predict: Callable, *args, **kwargs) -> Any:
+    """Return the result of a LID system for a text from the cache or by prediction.
+
+    All LID systems are deterministic, therefore repeated texts (e.g. boilerplate or
+    recurring ads) can reuse their results. The cache is keyed by a digest of the text
+    to keep its memory bounded and evicts the least recently used results.
+
+    :param str lid: Name of the LID system.
+    :param bytes digest: Digest of the text to classify.
+    :param Callable predict: Function computing the result of the LID system.
+    :return: Result of predict(*args, **kwargs).
+    :rtype: Any
+
+    """
+
+    cache = _worker["lid_cache"]
+    key = (lid, digest)
+    _worker["lid_cache_lookups"][lid] += 1
+    if key in cache:
+        cache.move_to_end(key)
+        return cache[key]
+
+    _worker["lid_cache_predictions"][lid] += 1
+    result = predict(*args, **kwargs)
+    cache[key] = result
+    if len(cache) > LID_CACHE_SIZE:
+        cache.popitem(last=False)
     return result
 
 
+def _prefetch_fasttext_lid(lid: str, ft_model, texts: Dict[bytes, str]) -> None:
+    """Predict all uncached texts with a single call of a fasttext model and cache them.
+
+    Texts with newlines are left out, as fasttext rejects them. They are predicted and
+    reported on their own by _cached_lid, as are all texts of a batch that cannot be
+    predicted.
+
+    :param str lid: Name of the LID system.
+    :param ft_model: Fasttext LID model.
+    :param Dict[bytes, str] texts: Texts without digits keyed by the digest of the text.
+    :return: None.
+    :rtype: None
+
+    """
+
+    cache = _worker["lid_cache"]
+    missing = [
+        digest
+        for digest, text in texts.items()
+        if (lid, digest) not in cache and "\n" not in text
+    ]
+    if not missing:
+        return
+
+    try:
+        results = fasttext_lids(
+            [texts[digest] for digest in missing],
+            ft_model,
+            round_ndigits=_worker["round_ndigits"],
+        )
+    except ValueError:
+        return
+
+    _worker["lid_cache_predictions"][lid] += len(missing)
+    for digest, result in zip(missing, results):
+        cache[(lid, digest)] = result
+        if len(cache) > LID_CACHE_SIZE:
+            cache.popitem(last=False)
+
+
+def _log_lid_cache_stats() -> None:
+    """Log the number of lookups and the hit rate of the LID cache per LID system.
+
+    :return: None.
+    :rtype: None
+
+    """
+
+    predictions = _worker["lid_cache_predictions"]
+    for lid, lookups in sorted(_worker["lid_cache_lookups"].items()):
+        log.info(
+            f"LID-CACHE {lid} lookups: {lookups} "
+            f"hit rate: {1 - predictions[lid] / lookups:.3f}"
+        )
+
+
+def _init_pool_worker(*worker_args) -> None:
+    """Initialize a worker process of the pool.
+
+    Forked worker processes inherit the LID models of the main process. Otherwise,
+    the LID models are loaded with the arguments of _init_worker.
+
+    The statistics of the LID cache are logged when the worker process exits.
+
+    :param worker_args: Arguments of _init_worker if the models are not inherited.
+    :return: None.
+    :rtype: None
+
+    """
+
+    if worker_args:
+        _init_worker(*worker_args)
+    Finalize(None, _log_lid_cache_stats, exitpriority=10)
+
+
+# second and formatted timestamp of the last call of _timestamp()
+_timestamp_cache: list = [None, ""]
+
+
+def _timestamp() -> str:
+    """Return the current UTC time in seconds precision as ISO 8601 string.
+
+    The string is only formatted again if the second has changed since the last call.
+
+    :return: Current time.
+    :rtype: str
+
+    """
+
+    now = int(time.time())
+    if _timestamp_cache[0] != now:
+        _timestamp_cache[:] = [
+            now,
+            datetime.datetime.fromtimestamp(now, datetime.timezone.utc).isoformat(
+                sep="T", timespec="seconds"
+            ),
+        ]
+    return _timestamp_cache[1]
+
+
+def _predict_lids(j: dict, digest: bytes, text: str, ft_text: str) -> Dict[str, Any]:
+    """Apply all LID systems of the current process to the text of a content item.
+
+    :param dict j: Content item in impresso rebuilt format with a text.
+    :param bytes digest: Digest of the text.
+    :param str text: Text for language identification.
+    :param str ft_text: Text without digits for the fasttext models.
+    :return: Language predictions per LID system.
+    :rtype: Dict[str, Any]
+
+    """
+
+    lids = _worker["lids"]
+    round_ndigits = _worker["round_ndigits"]
+    impresso_ft_model = _worker["impresso_ft_model"]
+    wp_ft_model = _worker["wp_ft_model"]
+    predictions = {}
+
+    # keep the order of the LID systems in the output
+    if "langdetect" in lids:
+        predictions["langdetect"] = None
+    if "langid" in lids:
+        predictions["langid"] = None
+
+    # fasttext with our own de/fr/lb model
+    if "impresso_ft" in lids and impresso_ft_model is not None:
+        try:
+            predictions["impresso_ft"] = _cached_lid(
+                "impresso_ft",
+                digest,
+                fasttext_lid,
+                ft_text,
+                impresso_ft_model,
+                round_ndigits=round_ndigits,
+                strip_digits=False,
+            )
+        except:
+            predictions["impresso_ft"] = None
+            log.error(f"IMPRESSO-FT-ERROR-WITH {sys.exc_info()[0]}")
+    else:
+        predictions["impresso_ft"] = None
+
+    # fasttext with public wikipedia model
+    if "wp_ft" in lids and wp_ft_model is not None:
+        try:
+            predictions["wp_ft"] = _cached_lid(
+                "wp_ft",
+                digest,
+                fasttext_lid,
+                ft_text,
+                wp_ft_model,
+                round_ndigits=round_ndigits,
+                strip_digits=False,
+            )
+        except:
+            predictions["wp_ft"] = None
+            log.error(f"WP-FT-ERROR-WITH {sys.exc_info()[0]}")
+    else:
+        predictions["wp_ft"] = None
+
+    # averaged fasttext with public wikipedia model
+    if "wp_ft_avg" in lids and wp_ft_model is not None:
+        try:
+            predictions["wp_ft_avg"] = _cached_lid(
+                "wp_ft_avg",
+                digest,
+                avg_fasttext_lid,
+                ft_text,
+                wp_ft_model,
+                3,
+                round_ndigits=round_ndigits,
+                strip_digits=False,
+            )
+        except:
+            predictions["wp_ft_avg"] = None
+            log.error(f"WP-FT-AVG-ERROR-WITH {sys.exc_info()[0]}")
+    elif "wp_ft_avg" in lids:
+        predictions["wp_ft_avg"] = None
+
+    # the slower langdetect and langid systems are skipped if impresso_ft is confident
+    threshold = _worker["confidence_skip_threshold"]
+    if (
+        threshold is None
+        or not predictions["impresso_ft"]
+        or predictions["impresso_ft"][0]["prob"] < threshold
+    ):
+        # predict with langdetect
+        if "langdetect" in lids:
+            try:
+                langdetect_result = _cached_lid(
+                    "langdetect",
+                    digest,
+                    avg_langdetect_lid,
+                    text,
+                    3,
+                    round_ndigits=round_ndigits,
+                )
+            except LangDetectException:
+                log.error(
+                    f"LANGDETECT-ERROR-WITH {j['id']} {j['ft']}  {sys.exc_info()[0]}"
+                )
+                langdetect_result = None
+            predictions["langdetect"] = langdetect_result
+
+        # predict with langid
+        if "langid" in lids:
+            try:
+                predictions["langid"] = _cached_lid(
+                    "langid",
+                    digest,
+                    langid_lid,
+                    text,
+                    _worker["langid_model"],
+                    round_ndigits=round_ndigits,
+                )
+            except:
+                log.error(f"LANGID-ERROR-WITH {sys.exc_info()[0]}")
+                predictions["langid"] = None
+    else:
+        # tag skipped systems such that their null predictions are not taken as
+        # missing evidence by the later stages
+        skipped_lids = [lid for lid in ("langdetect", "langid") if lid in lids]
+        if skipped_lids:
+            predictions["skipped_lids"] = skipped_lids
+
+    return predictions
+
+
+def _process_items(items: List[dict]) -> List[dict]:
+    """Apply all LID models of the current process to a batch of content items.
+
+    The texts of all content items are predicted with a single call per fasttext
+    model.
+
+    :param List[dict] items: Content items in impresso rebuilt format.
+    :return: Language predictions per content item.
+    :rtype: List[dict]
+
+    """
+
+    # texts for lid and texts without digits for the fasttext models keyed by digest
+    texts = {}
+    ft_texts = {}
+    prepared = []
+    lid_max_chars = _worker["lid_max_chars"]
+
+    for j in items:
+        if log.isEnabledFor(logging.INFO):
+            log.info(f"WORKING ON {j['id']}")
+        ratio = digest = None
+
+        try:
+            # perform lid if text of content item is available and has a minimal length
+            if (
+                "ft" in j
+                and isinstance(j["ft"], str)
+                and len(j["ft"].strip()) >= _worker["minimal_text_length"]
+            ):
+                ratio = round(alphabetical_ratio(j["ft"]), _worker["round_ndigits"])
+
+                # skip lid for texts consisting mostly of OCR noise, digits or
+                # punctuation
+                if ratio >= _worker["alphabetical_ratio_threshold"]:
+                    text = j["ft"][:lid_max_chars] if lid_max_chars else j["ft"]
+                    digest = hashlib.blake2b(
+                        text.encode("utf-8"), digest_size=16
+                    ).digest()
+                    texts[digest] = text
+                    # digits are removed once for all fasttext models
+                    ft_texts[digest] = _DIGIT_RE.sub("", text)
+        except:
+            log.error(f"PROBLEM WITH {sys.exc_info()} {j}")
+            exit(1)
+
+        prepared.append((j, ratio, digest))
+
+    for lid, ft_model in (
+        ("impresso_ft", _worker["impresso_ft_model"]),
+        ("wp_ft", _worker["wp_ft_model"]),
+    ):
+        if lid in _worker["lids"] and ft_model is not None:
+            _prefetch_fasttext_lid(lid, ft_model, ft_texts)
+
+    return [
+        _process_item(j, ratio, digest, texts.get(digest), ft_texts.get(digest))
+        for j, ratio, digest in prepared
+    ]
+
+
+def _process_item(
+    j: dict,
+    ratio: Optional[float],
+    digest: Optional[bytes],
+    text: Optional[str],
+    ft_text: Optional[str],
+) -> dict:
+    """Return the language predictions of a single content item.
+
+    :param dict j: Content item in impresso rebuilt format.
+    :param Optional[float] ratio: Alphabetical ratio of the text if lid is applied.
+    :param Optional[bytes] digest: Digest of the text if its languages are predicted.
+    :param Optional[str] text: Text for language identification.
+    :param Optional[str] ft_text: Text without digits for the fasttext models.
+    :return: Language predictions of the content item.
+    :rtype: dict
+
+    """
+
+    lid_info = {}
+
+    try:
+        if ratio is not None:
+            lid_info["alphabetical_ratio"] = ratio
+        if digest is not None:
+            lid_info.update(_predict_lids(j, digest, text, ft_text))
+
+        return {
+            "tp": j["tp"],
+            "id": j["id"],
+            "len": len(j.get("ft", "")),
+            "orig_lg": j.get("lg"),
+            "language_identifier_version": {
+                "version": _worker["version"],
+                "ts": _timestamp(),
+            },
+            **lid_info,
+        }
+    except:
+        log.error(f"PROBLEM WITH {sys.exc_info()} {lid_info} {j}")
+        exit(1)
+
+
 class LanguageIdentifier(object):
     """Predict languages for content items.
 
@@ -157,19 +916,34 @@ class LanguageIdentifier(object):
     :param int minimal_text_length: threshold for text length in characters to apply
         automatic language identification.
 
+    :param float alphabetical_ratio_threshold: threshold for the ratio of alphabetic
+        characters in a text to apply automatic language identification.
+
     :param Set[str] lids: Set of LID systems predict to language/probability pairs.
         Therefore, orig_lg is not seen as LID system as it "predicts" only a single
         language if any.
 
-    :attr type results: Description of parameter `results`
-
     :param int round_ndigits: Number of decimal places in the output
 
     :param str git_describe: Output of git describe to use as version if not empty
         string
 
-    :attr list results: Collection of content items with the language prediction of
-        various systems.
+    :param int workers: Number of worker processes for language identification. With
+        a single worker, all content items are processed in the main process.
+
+    :param bool quantize_models: Quantize the fasttext models in memory after loading.
+
+    :param Optional[float] confidence_skip_threshold: If set, langdetect and langid are
+        not applied to texts for which impresso_ft predicts a language with at least
+        this probability. Their predictions are null in the output and listed in the
+        attribute skipped_lids.
+
+    :param Optional[int] lid_max_chars: If set, only the first lid_max_chars characters
+        of a text are used for language identification. The length and alphabetical
+        ratio in the output are still computed on the full text.
+
+    :param int decompression_threads: Number of threads for decompressing a local bz2
+        input file with indexed_bzip2.
 
     """
 
@@ -180,9 +954,15 @@ class LanguageIdentifier(object):
         impresso_ft: str,
         wp_ft: str,
         minimal_text_length: int,
+        alphabetical_ratio_threshold: float,
         lids: list,
         round_ndigits: int,
         git_describe: str,
+        workers: int,
+        quantize_models: bool = False,
+        confidence_skip_threshold: Optional[float] = None,
+        lid_max_chars: Optional[int] = None,
+        decompression_threads: int = 1,
     ):
 
         self.infile: str = infile
@@ -190,6 +970,7 @@ class LanguageIdentifier(object):
         self.impresso_ft: str = impresso_ft
         self.wp_ft: str = wp_ft
         self.minimal_text_length: int = minimal_text_length
+        self.alphabetical_ratio_threshold: float = alphabetical_ratio_threshold
 
         self.lids: Set[str] = set(lids)
         log.info(
@@ -197,7 +978,11 @@ class LanguageIdentifier(object):
         )
         self.round_ndigits = round_ndigits
         self.git_describe = git_describe
-        self.results = []
+        self.workers: int = max(1, workers or 1)
+        self.quantize_models: bool = quantize_models
+        self.confidence_skip_threshold: Optional[float] = confidence_skip_threshold
+        self.lid_max_chars: Optional[int] = lid_max_chars
+        self.decompression_threads: int = max(1, decompression_threads or 1)
 
     def run(self):
         """Run the language identification process."""
@@ -205,140 +990,120 @@ class LanguageIdentifier(object):
             "Language identification started with config: "
             f"{json.dumps(vars(self), default=lambda x: list(x) if isinstance(x, set) else x)}"
         )
-        self.language_identification()
-        self.write_output()
+        self.write_output(self.language_identification())
         log.info("Language identification finished.")
 
-    def language_identification(self) -> None:
-        """Run multiple language identifications with the models provided and update
-        results
+    def language_identification(self) -> Iterable[dict]:
+        """Run multiple language identifications with the models provided and yield
+        the results per content item
+
+        Content items are independent of each other and are distributed over a pool of
+        worker processes forked after the LID models have been loaded. The read-only
+        models are thereby shared between all workers. Forking is only used on Linux;
+        on other platforms (e.g. macOS or Windows), where fork is unsafe or unavailable,
+        every worker process loads the models itself. The order of the content items is
+        preserved. Only a bounded number of content items is handed over to the pool at
+        once, so memory does not grow with the size of the input.
         """
 
-        # initialize with langid lid classifier
-        langid_lid = langid.LanguageIdentifier.from_modelstring(
-            langid.model, norm_probs=True
+        worker_args = (
+            self.impresso_ft,
+            self.wp_ft,
+            self.lids,
+            self.minimal_text_length,
+            self.alphabetical_ratio_threshold,
+            self.round_ndigits,
+            self.git_describe or __version__,
+            self.quantize_models,
+            self.confidence_skip_threshold,
+            self.lid_max_chars,
         )
-        # we no longer restrict it to certain languages
-        # langid_lid.set_languages(['de', 'fr', 'en', 'lb'])
-
-        # load provided FastText models
-        impresso_ft_model = wp_ft_model = None
-
-        if self.impresso_ft is not None:
-            impresso_ft_model = fasttext.load_model(self.impresso_ft)
-        if self.wp_ft is not None:
-            wp_ft_model = fasttext.load_model(self.wp_ft)
-
-        # iterate over content items and apply all LID models
-        for j in self.next_contentitem():
-            log.info(f"WORKING ON {j['id']}")
-            jinfo = {}
-
-            try:
-                # initialize information
-                jinfo.update(
-                    {
-                        "tp": j["tp"],
-                        "id": j["id"],
-                        "len": len(j.get("ft", "")),
-                        "orig_lg": j.get("lg"),
-                        "language_identifier_version": {
-                            "version": self.git_describe or __version__,
-                            "ts": datetime.datetime.now(
-                                datetime.timezone.utc
-                            ).isoformat(sep="T", timespec="seconds"),
-                        },
-                    }
-                )
-
-                # perform lid if text of content item is available and has a minimal length
-                if (
-                    "ft" in j
-                    and isinstance(j["ft"], str)
-                    and len(j["ft"].strip()) >= self.minimal_text_length
-                ):
-                    jinfo["alphabetical_ratio"] = round(
-                        alphabetical_ratio(j["ft"]), self.round_ndigits
-                    )
-
-                    # predict with langdetect
-                    if "langdetect" in self.lids:
-                        try:
-                            langdetect_result = avg_langdetect_lid(
-                                j["ft"], 3, round_ndigits=self.round_ndigits
-                            )
-                        except LangDetectException:
-                            log.error(
-                                f"LANGDETECT-ERROR-WITH {jinfo} {j['ft']}  {sys.exc_info()[0]}"
-                            )
-                            langdetect_result = None
-                        jinfo["langdetect"] = langdetect_result
-
-                    # predict with langid
-                    if "langid" in self.lids:
-                        try:
-                            lang_orig, lang_prob_orig = langid_lid.classify(j["ft"])
-                            jinfo["langid"] = [
-                                {
-                                    "lang": lang_orig,
-                                    "prob": round(lang_prob_orig, self.round_ndigits),
-                                }
-                            ]
-                        except:
-                            log.error(f"LANGID-ERROR-WITH {sys.exc_info()[0]}")
-                            jinfo["langid"] = None
-
-                    # fasttext with our own de/fr/lb model
-                    if "impresso_ft" in self.lids and impresso_ft_model is not None:
-                        try:
-                            jinfo["impresso_ft"] = fasttext_lid(
-                                j["ft"],
-                                impresso_ft_model,
-                                round_ndigits=self.round_ndigits,
-                            )
-                        except:
-                            jinfo["impresso_ft"] = None
-                            log.error(f"IMPRESSO-FT-ERROR-WITH {sys.exc_info()[0]}")
-                    else:
-                        jinfo["impresso_ft"] = None
-
-                    # fasttext with public wikipedia model
-                    if "wp_ft" in self.lids and wp_ft_model is not None:
-                        try:
-                            jinfo["wp_ft"] = fasttext_lid(
-                                j["ft"], wp_ft_model, round_ndigits=self.round_ndigits
-                            )
-                        except:
-                            jinfo["wp_ft"] = None
-                            log.error(f"WP-FT-ERROR-WITH {sys.exc_info()[0]}")
-                    else:
-                        jinfo["wp_ft"] = None
-
-                self.results.append(jinfo)
-            except:
-                log.error(f"PROBLEM WITH {sys.exc_info()} {jinfo} {j}")
-                exit(1)
 
-    def write_output(self) -> None:
+        # worker processes can only share the loaded models if they are forked, which
+        # is unsafe on macOS and not available on Windows
+        fork = sys.platform == "linux"
+        if self.workers == 1 or fork:
+            _init_worker(*worker_args)
+
+        contentitems = self.next_contentitem()
+        batches = iter(lambda: list(itertools.islice(contentitems, LID_BATCH_SIZE)), [])
+
+        # iterate over batches of content items and apply all LID models
+        if self.workers == 1:
+            for batch in batches:
+                yield from _process_items(batch)
+            _log_lid_cache_stats()
+            return
+
+        if fork:
+            pool_args = {"mp_context": multiprocessing.get_context("fork")}
+        else:
+            log.warning(
+                f"Workers are not forked on {sys.platform}, "
+                "each worker process loads the models."
+            )
+            pool_args = {"initargs": worker_args}
+
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_pool_worker, **pool_args
+        ) as executor:
+            # start the worker processes before the input file is opened, as the
+            # decompression threads of indexed_bzip2 must not be alive during a fork
+            executor.submit(int).result()
+
+            # Executor.map submits all its input at once, so keep a bounded window of
+            # pending batches and submit the next batch whenever the oldest is done
+            pending = deque(
+                executor.submit(_process_items, batch)
+                for batch in itertools.islice(batches, self.workers * 2)
+            )
+            while pending:
+                results = pending.popleft().result()
+                for batch in itertools.islice(batches, 1):
+                    pending.append(executor.submit(_process_items, batch))
+                yield from results
+
+    def write_output(self, results: Iterable[dict]) -> None:
         """
-        Write results to jsonline output file.
+        Write results to jsonline output file as soon as they are available.
         """
 
-        with smart_open.open(self.outfile, mode="w", encoding="utf-8") as f_out:
-            for r in self.results:
-                print(
-                    json.dumps(r, ensure_ascii=False, separators=(",", ":")), file=f_out
-                )
+        with smart_open.open(self.outfile, mode="wb") as f_out:
+            for r in results:
+                f_out.write(orjson.dumps(r))
+                f_out.write(b"\n")
 
     def next_contentitem(self) -> Iterable[dict]:
         """
         Yield each contentitem.
+
+        Local bz2 files are decompressed with decompression_threads threads by
+        indexed_bzip2 if it is installed.
         """
 
-        with smart_open.open(self.infile, encoding="utf-8") as reader:
+        with self.open_infile() as reader:
             for line in reader:
                 if line.strip():
-                    yield json.loads(line)
+                    yield orjson.loads(line)
+
+    def open_infile(self) -> io.BufferedIOBase:
+        """
+        Return the input file opened in binary mode.
+        """
+
+        if (
+            indexed_bzip2 is not None
+            and self.infile.endswith(".bz2")
+            and os.path.isfile(self.infile)
+        ):
+            return io.BufferedReader(
+                indexed_bzip2.open(
+                    self.infile, parallelization=self.decompression_threads
+                ),
+                buffer_size=4 << 20,
+            )
+
+        return smart_open.open(self.infile, mode="rb")
 
 
 if __name__ == "__main__":
@@ -351,7 +1116,8 @@ if __name__ == "__main__":
 
     EPILOG = (
         "All tools use two-letter ISO 639-1 codes, except wp_ft which "
-        "recognizes additional languages identifiable only by 3 letter codes."
+        "recognizes additional languages identifiable only by 3 letter codes. "
+        "wp_ft_avg averages the predictions of the wp_ft model over 3 slices of a text."
     )
     parser = argparse.ArgumentParser(description=DESCRIPTION, epilog=EPILOG)
     parser.add_argument(
@@ -385,6 +1151,13 @@ if __name__ == "__main__":
         type=int,
         help="minimal text length of content items to apply automatic landuage identification (default %(default)s)",
     )
+    parser.add_argument(
+        "--alphabetical-ratio-threshold",
+        default=0.0,
+        type=float,
+        metavar="R",
+        help="minimal ratio of alphabetic characters of content items to apply automatic language identification (default %(default)s)",
+    )
     parser.add_argument(
         "--lids",
         nargs="+",
@@ -416,6 +1189,39 @@ if __name__ == "__main__":
         default="",
         help="output of git describe command for ingesting git version into JSON as version string",
     )
+    parser.add_argument(
+        "--workers",
+        default=os.cpu_count(),
+        type=int,
+        metavar="N",
+        help="number of worker processes for language identification (default %(default)s)",
+    )
+    parser.add_argument(
+        "--quantize-models",
+        action="store_true",
+        help="quantize the fasttext models in memory after loading; quantized .ftz models can also be passed directly",
+    )
+    parser.add_argument(
+        "--confidence-skip-threshold",
+        default=None,
+        type=float,
+        metavar="P",
+        help="skip langdetect and langid if impresso_ft predicts a language with at least probability P and list them in skipped_lids; speeds up LID, but the support statistics of stage 1b for langdetect and langid are then computed only on the less confident content items (default %(default)s)",
+    )
+    parser.add_argument(
+        "--lid-max-chars",
+        default=None,
+        type=int,
+        metavar="K",
+        help="apply language identification only to the first K characters of a text; length and alphabetical ratio still refer to the full text (default %(default)s)",
+    )
+    parser.add_argument(
+        "--decompression-threads",
+        default=1,
+        type=int,
+        metavar="N",
+        help="number of threads for decompressing a local bz2 input file with indexed_bzip2; raise only if the CPUs are not used by other workers or processes (default %(default)s)",
+    )
     arguments = parser.parse_args()
 
     log_levels = [
@@ -437,9 +1243,15 @@ if __name__ == "__main__":
         "impresso_ft",
         "wp_ft",
         "minimal_text_length",
+        "alphabetical_ratio_threshold",
         "round_ndigits",
         "lids",
         "git_describe",
+        "workers",
+        "quantize_models",
+        "confidence_skip_threshold",
+        "lid_max_chars",
+        "decompression_threads",
     }
 
     LanguageIdentifier(
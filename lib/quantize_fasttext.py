@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+"""
+Quantize a binary fasttext LID model into a compressed .ftz model
+
+Quantized models need a fraction of the memory of the original models and are loaded
+transparently by fasttext.load_model. Without training data, only the embedding matrix
+is compressed. With the training data of the model, the dictionary can additionally
+be pruned to the most important features and the model retrained.
+"""
+
+__version__ = "2024.04.12"
+
+import logging
+import os
+from typing import Optional
+
+import fasttext
+
+log = logging.getLogger(__name__)
+
+
+def quantize_model(
+    infile: str,
+    outfile: str,
+    train_file: Optional[str] = None,
+    cutoff: int = 100000,
+    qnorm: bool = True,
+) -> None:
+    """Quantize a fasttext model and save it.
+
+    Already quantized models are rejected with an error.
+
+    :param str infile: Path to binary fasttext model.
+    :param str outfile: Path to quantized output model (.ftz).
+    :param Optional[str] train_file: Training data of the model. If given, the
+        dictionary is pruned to cutoff features and the model is retrained.
+    :param int cutoff: Number of features to keep when retraining.
+    :param bool qnorm: Quantize the norm separately.
+    :return: None.
+    :rtype: None
+
+    """
+
+    model = fasttext.load_model(infile)
+    if model.is_quantized():
+        # fasttext crashes when quantizing a quantized model again
+        log.error(f"Model {infile} is already quantized.")
+        exit(1)
+
+    if train_file is not None:
+        model.quantize(input=train_file, qnorm=qnorm, retrain=True, cutoff=cutoff)
+    else:
+        model.quantize(qnorm=qnorm)
+
+    model.save_model(outfile)
+    log.info(
+        f"Quantized {infile} ({os.path.getsize(infile)} bytes) into {outfile} "
+        f"({os.path.getsize(outfile)} bytes)."
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    DESCRIPTION = "Quantize a binary fasttext LID model into a compressed .ftz model."
+
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument(
+        "-v",
+        "--verbose",
+        default=3,
+        type=int,
+        metavar="LEVEL",
+        help="set verbosity level: 0=CRITICAL, 1=ERROR, 2=WARNING, 3=INFO 4=DEBUG (default %(default)s)",
+    )
+    parser.add_argument(
+        "-i",
+        "--infile",
+        required=True,
+        help="path to binary fasttext model",
+    )
+    parser.add_argument(
+        "-o",
+        "--outfile",
+        required=True,
+        help="path to quantized fasttext model (.ftz)",
+    )
+    parser.add_argument(
+        "--train-file",
+        default=None,
+        metavar="FILE",
+        help="training data of the model for pruning and retraining (default %(default)s)",
+    )
+    parser.add_argument(
+        "--cutoff",
+        default=100000,
+        type=int,
+        help="number of features to keep when retraining (default %(default)s)",
+    )
+    arguments = parser.parse_args()
+
+    log_levels = [
+        logging.CRITICAL,
+        logging.ERROR,
+        logging.WARNING,
+        logging.INFO,
+        logging.DEBUG,
+    ]
+
+    logging.basicConfig(
+        level=log_levels[arguments.verbose],
+        format="%(asctime)-15s %(filename)s:%(lineno)d %(levelname)s: %(message)s",
+    )
+    log.info(f"{arguments}")
+
+    quantize_model(
+        arguments.infile,
+        arguments.outfile,
+        train_file=arguments.train_file,
+        cutoff=arguments.cutoff,
+    )